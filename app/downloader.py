@@ -6,8 +6,11 @@ import hashlib
 import threading
 import yt_dlp
 from .utils import extract_video_id
+from .logging_config import task_context
 
 logger = logging.getLogger(__name__)
+# 진행률 로그 전용 로거 (logging_config에서 샘플링 대상)
+progress_logger = logging.getLogger(f"{__name__}.progress")
 
 def get_ffmpeg_path():
     """시스템에서 FFmpeg 경로 찾기"""
@@ -59,6 +62,10 @@ class ProgressHook:
                 speed = d.get('speed', 0)
                 eta = d.get('eta', 0)
                 
+                # 진행 로그는 RateLimitFilter로 샘플링됨
+                progress_logger.debug("Download progress %d%% (%d/%d bytes)",
+                                      progress, self.downloaded_bytes, self.total_bytes)
+                
                 # 진행 상황 업데이트
                 self.task_manager.update_task(
                     self.task_id,
@@ -87,12 +94,15 @@ class ProgressHook:
                 error=d.get('error', 'Unknown error during download')
             )
 
-def download_audio_async(task_manager, task_id, url, download_dir, quality='192'):
+def download_audio_async(task_manager, task_id, url, storage, quality='192'):
     """
     비동기 방식으로 YouTube에서 오디오 다운로드
     별도 스레드에서 실행됨
+    임시 저장소에서 다운로드/변환 후 완료된 파일만 영구 저장소로 이동
     """
     try:
+        download_dir = storage.scratch_dir(task_id)
+        
         task_manager.update_task(task_id, status='starting')
         
         # 비디오 ID 추출 (짧은 파일명을 위해)
@@ -123,6 +133,9 @@ def download_audio_async(task_manager, task_id, url, download_dir, quality='192'
             'noplaylist': True,
             'progress_hooks': [progress_hook],
             'quiet': False,
+            # yt-dlp 출력도 로깅 큐를 거치도록 (진행률은 훅으로 추적)
+            'logger': logging.getLogger('yt_dlp'),
+            'noprogress': True,
         }
         
         # FFmpeg 경로가 있으면 추가
@@ -157,11 +170,21 @@ def download_audio_async(task_manager, task_id, url, download_dir, quality='192'
                     raise FileNotFoundError(f"MP3 file not found after download: {file_path}")
             
             # 메타데이터 저장
-            with open(os.path.join(download_dir, f"{video_id}.info.txt"), 'w', encoding='utf-8') as f:
+            info_file = os.path.join(download_dir, f"{video_id}.info.txt")
+            with open(info_file, 'w', encoding='utf-8') as f:
                 f.write(f"Title: {title}\nAuthor: {info_dict.get('uploader', 'Unknown')}\nLength: {duration} seconds\nURL: {url}")
             
+            # 다운로드 중 작업이 삭제된 경우 영구 저장소로 옮기지 않음
+            if task_manager.get_task(task_id) is None:
+                logger.info("Task was deleted during download, discarding files")
+                return
+            
+            # 완료된 파일을 영구 저장소로 이동
+            file_path = storage.commit(task_id, file_path)
+            storage.commit(task_id, info_file)
+            
             # 작업 완료 업데이트
-            task_manager.update_task(
+            updated = task_manager.update_task(
                 task_id,
                 status='completed',
                 progress=100,
@@ -172,19 +195,32 @@ def download_audio_async(task_manager, task_id, url, download_dir, quality='192'
                 file_size=os.path.getsize(file_path) if os.path.exists(file_path) else 0
             )
             
+            # 이동 직후 작업이 삭제된 경우 고아 파일이 남지 않도록 정리
+            if not updated:
+                logger.info("Task was deleted during commit, removing committed files")
+                storage.delete_task_files(task_id)
+            
     except Exception as e:
-        logger.error(f"Error in download task {task_id}: {str(e)}", exc_info=True)
+        logger.exception("Error in download task %s", task_id)
         task_manager.update_task(
             task_id,
             status='failed',
             error=str(e)
         )
+    finally:
+        # 남은 중간 파일(.webm, .part 등) 정리
+        storage.discard_scratch(task_id)
+
+def _run_download_task(task_manager, task_id, url, storage, quality):
+    """작업 컨텍스트 안에서 다운로드 실행 (스레드 로그에 task_id 부여)"""
+    with task_context(task_id):
+        download_audio_async(task_manager, task_id, url, storage, quality)
 
-def start_download_task(task_manager, task_id, url, download_dir, quality):
+def start_download_task(task_manager, task_id, url, storage, quality):
     """새 다운로드 작업 시작"""
     thread = threading.Thread(
-        target=download_audio_async,
-        args=(task_manager, task_id, url, download_dir, quality),
+        target=_run_download_task,
+        args=(task_manager, task_id, url, storage, quality),
         daemon=True
     )
     thread.start()
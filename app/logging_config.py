@@ -0,0 +1,205 @@
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# 현재 실행 컨텍스트의 작업 ID (요청 스레드/다운로드 스레드별로 독립)
+_current_task_id = contextvars.ContextVar('task_id', default=None)
+
+_listener = None
+
+# 진행률 등 반복 로그가 많은 로거 (이 로거들에만 RateLimitFilter 적용)
+RATE_LIMITED_LOGGERS = ('app.downloader.progress', 'yt_dlp')
+
+@contextmanager
+def task_context(task_id):
+    """블록 안에서 기록되는 로그에 task_id를 붙임"""
+    token = _current_task_id.set(task_id)
+    try:
+        yield
+    finally:
+        _current_task_id.reset(token)
+
+class TaskContextFilter(logging.Filter):
+    """로그 레코드에 현재 task_id 추가 (호출 스레드에서 실행되어야 함)"""
+
+    def filter(self, record):
+        if not hasattr(record, 'task_id'):
+            record.task_id = _current_task_id.get()
+        return True
+
+class RateLimitFilter(logging.Filter):
+    """
+    동일 메시지(로거 + task_id + 메시지 템플릿)를 interval 초당 burst 개로 제한
+    WARNING 이상 레벨은 제한하지 않음
+    로거 필터로 붙으므로 호출 스레드에서 실행됨 (task_id는 컨텍스트에서 직접 읽음)
+    억제된 개수는 다음 로그 기록 시 만료된 구간을 정리하면서 요약 레코드로 남김
+    (이후 로그가 전혀 없으면 요약도 기록되지 않음)
+    """
+
+    def __init__(self, burst=5, interval=10.0, max_level=logging.INFO):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.max_level = max_level
+        self.lock = threading.Lock()
+        self.windows = {}  # key -> [윈도우 시작 시각, 통과 수, 억제 수]
+        self.last_sweep = time.monotonic()
+
+    def filter(self, record):
+        if record.levelno > self.max_level or self.burst <= 0:
+            return True
+
+        try:
+            allowed, expired = self._check(record)
+        except Exception:
+            # 로깅 호출이 요청/다운로드 스레드를 중단시키면 안 됨
+            return True
+
+        for (name, task_id, msg), suppressed in expired:
+            logging.getLogger(name).info(
+                "Suppressed %d repeated messages: %s", suppressed, msg,
+                extra={'task_id': task_id, 'suppressed': suppressed}
+            )
+
+        return allowed
+
+    def _check(self, record):
+        """통과 여부와 만료된 구간의 억제 개수 목록 반환"""
+        task_id = getattr(record, 'task_id', None) or _current_task_id.get()
+        key = (record.name, task_id, str(record.msg))
+        now = time.monotonic()
+        expired = []
+
+        with self.lock:
+            # 구간당 한 번 만료된 키 정리 (억제 개수는 요약으로 내보냄)
+            if now - self.last_sweep >= self.interval:
+                self.last_sweep = now
+                for k, w in list(self.windows.items()):
+                    if k != key and now - w[0] >= self.interval:
+                        del self.windows[k]
+                        if w[2]:
+                            expired.append((k, w[2]))
+
+            window = self.windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self.windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True, expired
+
+            if window[1] < self.burst:
+                window[1] += 1
+                return True, expired
+
+            window[2] += 1
+            return False, expired
+
+class JsonFormatter(logging.Formatter):
+    """로그 레코드를 한 줄 JSON으로 직렬화"""
+
+    def format(self, record):
+        entry = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created))
+                         + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+
+        task_id = getattr(record, 'task_id', None)
+        if task_id:
+            entry['task_id'] = task_id
+
+        suppressed = getattr(record, 'suppressed', None)
+        if suppressed:
+            entry['suppressed'] = suppressed
+
+        # 핸들러마다 traceback을 다시 포맷하지 않도록 캐시
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    포맷팅을 백그라운드 리스너로 미루는 QueueHandler
+    (기본 구현은 호출 스레드에서 traceback까지 포맷함)
+    """
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        # 인자는 호출 시점 값으로 고정하되 traceback 포맷은 리스너에서 수행
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+def setup_logging():
+    """
+    큐 기반 로깅 설정
+    요청 스레드는 큐에 넣기만 하고, 실제 출력/파일 기록은 백그라운드 리스너가 담당
+    """
+    global _listener
+
+    if _listener is not None:
+        return _listener
+
+    level = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    log_file = os.environ.get('LOG_FILE', '/tmp/yt-dlp-server.log')
+    max_bytes = int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024))
+    backup_count = int(os.environ.get('LOG_BACKUP_COUNT', 3))
+    rate_burst = int(os.environ.get('LOG_RATE_BURST', 5))
+    rate_interval = float(os.environ.get('LOG_RATE_INTERVAL', 10))
+
+    # Flask 리로더(DEBUG=true)의 감시 프로세스는 파일에 쓰지 않음
+    # (RotatingFileHandler는 여러 프로세스가 같은 파일을 쓰면 로테이션이 깨짐)
+    debug = os.environ.get('DEBUG', 'false').lower() == 'true'
+    if debug and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        log_file = None
+
+    formatter = JsonFormatter()
+
+    # 실제 출력 핸들러 (리스너 스레드에서만 실행)
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+        handlers.append(RotatingFileHandler(
+            log_file,
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+            encoding='utf-8'
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    # 요청 경로의 핸들러는 필터링 후 큐에 넣기만 함
+    log_queue = queue.Queue(-1)
+    queue_handler = DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(TaskContextFilter())
+
+    # 반복 로그가 많은 로거만 샘플링 (werkzeug 접근 로그 등은 그대로 기록)
+    rate_limit = RateLimitFilter(burst=rate_burst, interval=rate_interval)
+    for name in RATE_LIMITED_LOGGERS:
+        logging.getLogger(name).addFilter(rate_limit)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    return _listener
@@ -2,38 +2,29 @@ from flask import Flask, request, jsonify, send_file, url_for
 import os
 import time
 import logging
-import traceback
 from flask_cors import CORS
 from .task_manager import TaskManager
 from .downloader import start_download_task
+from .logging_config import setup_logging, task_context
+from .storage import Storage
 from .utils import validate_youtube_url, format_duration, format_file_size
 
-# 로깅 설정
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('/tmp/debug.log')  # 로그도 /tmp로 이동
-    ]
-)
+# 로깅 설정 (큐 기반, 백그라운드 기록)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 CORS(app)  # CORS 허용
 
-# 다운로드 경로를 /tmp 기반으로 변경
-BASE_DOWNLOAD_DIR = '/tmp'
+# 저장소 설정 (SCRATCH_DIR에 tmpfs 등 빠른 디스크를 지정하면 진행 중 파일은 그곳에 저장)
+BASE_DOWNLOAD_DIR = os.environ.get('DOWNLOAD_DIR', '/tmp')
+SCRATCH_DIR = os.environ.get('SCRATCH_DIR') or None
 os.makedirs(BASE_DOWNLOAD_DIR, exist_ok=True)
 
-# 작업 관리자 초기화 (기본 디렉토리만 전달)
-task_manager = TaskManager(BASE_DOWNLOAD_DIR)
+storage = Storage(BASE_DOWNLOAD_DIR, SCRATCH_DIR)
 
-def get_task_download_dir(task_id):
-    """특정 작업의 다운로드 디렉토리 반환"""
-    task_dir = os.path.join(BASE_DOWNLOAD_DIR, task_id)
-    os.makedirs(task_dir, exist_ok=True)
-    return task_dir
+# 작업 관리자 초기화
+task_manager = TaskManager(storage)
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -48,7 +39,8 @@ def request_download():
     """YouTube 비디오 다운로드 요청 엔드포인트"""
     try:
         data = request.json
-        logger.debug(f"Received download request: {data}")
+        logger.debug("Received download request: url=%s quality=%s",
+                     (data or {}).get('url'), (data or {}).get('quality'))
         
         if not data or 'url' not in data:
             return jsonify({"error": "URL이 제공되지 않았습니다"}), 400
@@ -58,18 +50,16 @@ def request_download():
         
         # URL 유효성 검사
         if not validate_youtube_url(url):
-            logger.warning(f"Invalid YouTube URL: {url}")
+            logger.warning("Invalid YouTube URL: %s", url)
             return jsonify({"error": "유효한 YouTube URL이 아닙니다"}), 400
         
         # 작업 생성
         task_id = task_manager.create_task(url, quality)
-        logger.info(f"Created download task {task_id} for URL: {url}")
+        with task_context(task_id):
+            logger.info("Created download task for URL: %s", url)
         
-        # 작업별 다운로드 디렉토리 생성
-        task_download_dir = get_task_download_dir(task_id)
-        
-        # 비동기 다운로드 시작 (작업별 디렉토리 사용)
-        start_download_task(task_manager, task_id, url, task_download_dir, quality)
+        # 비동기 다운로드 시작 (임시 저장소에서 진행 후 영구 저장소로 이동)
+        start_download_task(task_manager, task_id, url, storage, quality)
         
         # 응답 반환
         response = {
@@ -82,8 +72,7 @@ def request_download():
         return jsonify(response), 202  # 202 Accepted
         
     except Exception as e:
-        logger.error(f"다운로드 요청 처리 오류: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception("다운로드 요청 처리 오류")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/download/status/<task_id>', methods=['GET'])
@@ -135,8 +124,7 @@ def check_status(task_id):
         return jsonify(response)
         
     except Exception as e:
-        logger.error(f"상태 확인 처리 오류: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception("상태 확인 처리 오류")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/download/file/<task_id>', methods=['GET'])
@@ -155,9 +143,9 @@ def download_file(task_id):
                 "progress": task['progress']
             }), 400
         
-        file_path = task.get('output_file')
+        file_path = storage.resolve_output(task_id, task.get('output_file'))
         
-        if not file_path or not os.path.exists(file_path):
+        if not file_path:
             return jsonify({"error": "파일을 찾을 수 없습니다"}), 404
         
         # 파일 다운로드 제공
@@ -174,8 +162,7 @@ def download_file(task_id):
         )
         
     except Exception as e:
-        logger.error(f"파일 다운로드 처리 오류: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception("파일 다운로드 처리 오류")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/download/delete/<task_id>', methods=['DELETE'])
@@ -193,8 +180,7 @@ def delete_task(task_id):
         })
         
     except Exception as e:
-        logger.error(f"작업 삭제 처리 오류: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception("작업 삭제 처리 오류")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/tasks', methods=['GET'])
@@ -221,8 +207,7 @@ def list_tasks():
         })
         
     except Exception as e:
-        logger.error(f"작업 목록 조회 오류: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception("작업 목록 조회 오류")
         return jsonify({"error": str(e)}), 500
 
 # 임시 파일 정리를 위한 엔드포인트 (옵션)
@@ -230,32 +215,26 @@ def list_tasks():
 def cleanup_old_files():
     """오래된 임시 파일 정리"""
     try:
-        import shutil
-        import glob
-        
-        # 1시간 이상 된 디렉토리 찾기
-        current_time = time.time()
-        cleanup_count = 0
-        
-        for task_dir in glob.glob(os.path.join(BASE_DOWNLOAD_DIR, '*')):
-            if os.path.isdir(task_dir):
-                # 디렉토리 생성 시간 확인
-                dir_mtime = os.path.getmtime(task_dir)
-                if current_time - dir_mtime > 3600:  # 1시간 = 3600초
-                    try:
-                        shutil.rmtree(task_dir)
-                        cleanup_count += 1
-                        logger.info(f"Cleaned up old directory: {task_dir}")
-                    except Exception as e:
-                        logger.error(f"Failed to cleanup {task_dir}: {e}")
+        # 1시간 이상 지난 완료/실패 작업과 고아 디렉토리 정리 (1시간 = 3600초)
+        cleanup_count = task_manager.cleanup(3600)
         
         return jsonify({
             "status": "success",
-            "message": f"정리된 디렉토리 수: {cleanup_count}"
+            "message": f"정리된 항목 수: {cleanup_count}"
         })
         
     except Exception as e:
-        logger.error(f"정리 작업 오류: {str(e)}")
+        logger.exception("정리 작업 오류")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/storage', methods=['GET'])
+def storage_usage():
+    """저장소 계층별 사용량 조회 엔드포인트"""
+    try:
+        return jsonify(storage.usage())
+        
+    except Exception as e:
+        logger.exception("저장소 사용량 조회 오류")
         return jsonify({"error": str(e)}), 500
 
 if __name__ == '__main__':
@@ -265,4 +244,5 @@ if __name__ == '__main__':
     
     logger.info(f"Starting server on {host}:{port}, debug mode: {debug}")
     logger.info(f"Base download directory: {BASE_DOWNLOAD_DIR}")
+    logger.info(f"Scratch directory: {storage.scratch_root}")
     app.run(host=host, port=port, debug=debug)
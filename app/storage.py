@@ -0,0 +1,283 @@
+import os
+import re
+import time
+import uuid
+import errno
+import shutil
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 샤드 디렉토리 이름 (해시 접두어 2자리)
+_SHARD_NAME = re.compile(r'^[0-9a-f]{2}$')
+
+def _is_task_id(name):
+    """작업 ID(UUID) 형식인지 확인"""
+    try:
+        return str(uuid.UUID(name)) == name
+    except ValueError:
+        return False
+
+def _prune_empty_dirs(path, root):
+    """path부터 root 직전까지 비어있는 상위 디렉토리 삭제"""
+    root = os.path.abspath(root)
+    path = os.path.abspath(path)
+    while path != root and path.startswith(root + os.sep):
+        try:
+            os.rmdir(path)
+        except OSError:
+            break  # 비어있지 않거나 이미 삭제됨
+        path = os.path.dirname(path)
+
+def _dir_usage(path):
+    """디렉토리 하위 파일 크기/개수 합계"""
+    total_bytes = 0
+    total_files = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total_bytes += os.path.getsize(os.path.join(root, name))
+                total_files += 1
+            except OSError:
+                pass  # 집계 중 삭제된 파일
+    return total_bytes, total_files
+
+class Storage:
+    """
+    작업 산출물 저장소
+    - persistent: 완료된 파일과 작업 상태 (해시 접두어로 샤딩)
+    - scratch: 다운로드/변환 중인 임시 파일 (tmpfs 등 빠른 디스크 지정 가능)
+    """
+
+    def __init__(self, base_dir, scratch_dir=None):
+        self.base_dir = base_dir
+        self.tasks_dir = os.path.join(base_dir, 'tasks')
+        self.status_dir = os.path.join(base_dir, 'status')
+        # SCRATCH_DIR(/tmp, /dev/shm 등)는 다른 프로그램과 공유될 수 있으므로 전용 하위 디렉토리만 사용
+        if scratch_dir:
+            self.scratch_root = os.path.join(scratch_dir, 'yt-dlp-scratch')
+        else:
+            self.scratch_root = os.path.join(base_dir, 'scratch')
+        self.lock = threading.Lock()
+
+        for path in (self.tasks_dir, self.status_dir, self.scratch_root):
+            os.makedirs(path, exist_ok=True)
+
+        self._migrate_legacy_task_dirs()
+
+        # 영구 저장소 사용량은 시작 시 한 번 집계 후 증감으로 추적
+        persistent_bytes, persistent_files = _dir_usage(self.tasks_dir)
+        self.persistent_usage = {'bytes': persistent_bytes, 'files': persistent_files}
+
+    def _migrate_legacy_task_dirs(self):
+        """이전 평면 구조의 작업 디렉토리(base_dir/<task_id>)를 샤드 경로로 이동"""
+        for entry in list(os.scandir(self.base_dir)):
+            if not entry.is_dir() or not _is_task_id(entry.name):
+                continue
+
+            # 상태 파일이 있는 작업만 이동 (base_dir를 공유하는 다른 프로그램 보호)
+            task_id = entry.name
+            legacy_status = os.path.join(self.status_dir, f"{task_id}.json")
+            if not os.path.exists(legacy_status) and not os.path.exists(self.status_path(task_id)):
+                continue
+
+            target = self.task_dir(task_id, create=False)
+            try:
+                if os.path.exists(target):
+                    logger.warning("Skipping legacy task directory %s: %s already exists", entry.path, target)
+                    continue
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(entry.path, target)
+            except OSError as e:
+                logger.error("Failed to migrate task directory %s: %s", entry.path, e)
+
+    @staticmethod
+    def _shard(root, key):
+        """키의 해시 접두어 기반 2단계 샤드 경로"""
+        digest = hashlib.md5(key.encode()).hexdigest()
+        return os.path.join(root, digest[:2], digest[2:4])
+
+    def task_dir(self, task_id, create=True):
+        """작업의 영구 저장 디렉토리"""
+        path = os.path.join(self._shard(self.tasks_dir, task_id), task_id)
+        if create:
+            os.makedirs(path, exist_ok=True)
+        return path
+
+    def scratch_dir(self, task_id, create=True):
+        """작업의 임시(진행 중) 디렉토리"""
+        path = os.path.join(self._shard(self.scratch_root, task_id), task_id)
+        if create:
+            os.makedirs(path, exist_ok=True)
+        return path
+
+    def status_path(self, task_id, create=False):
+        """작업 상태 파일 경로"""
+        shard = self._shard(self.status_dir, task_id)
+        if create:
+            os.makedirs(shard, exist_ok=True)
+        return os.path.join(shard, f"{task_id}.json")
+
+    def iter_status_files(self):
+        """(task_id, 상태 파일 경로) 순회, 기존 평면 구조 파일은 샤드로 이동"""
+        for entry in list(os.scandir(self.status_dir)):
+            if entry.is_file() and entry.name.endswith('.json'):
+                # 이전 버전의 평면 상태 파일
+                try:
+                    os.replace(entry.path, self.status_path(entry.name[:-5], create=True))
+                except OSError as e:
+                    logger.error("Failed to migrate status file %s: %s", entry.path, e)
+
+        for root, _, files in os.walk(self.status_dir):
+            for name in files:
+                if name.endswith('.json'):
+                    yield name[:-5], os.path.join(root, name)
+
+    def remove_status(self, task_id):
+        """작업 상태 파일 삭제"""
+        status_file = self.status_path(task_id)
+        if os.path.exists(status_file):
+            os.remove(status_file)
+            _prune_empty_dirs(os.path.dirname(status_file), self.status_dir)
+
+    def commit(self, task_id, src_path):
+        """
+        임시 파일을 영구 저장소로 원자적으로 이동하고 최종 경로 반환
+        다른 파일시스템이면 대상 디렉토리에 복사 후 rename
+        """
+        dest_path = os.path.join(self.task_dir(task_id), os.path.basename(src_path))
+
+        # 같은 이름의 파일을 덮어쓰는 경우 기존 크기를 사용량에서 제외
+        try:
+            replaced_bytes = os.path.getsize(dest_path)
+            replaced_files = 1
+        except OSError:
+            replaced_bytes = 0
+            replaced_files = 0
+
+        try:
+            os.replace(src_path, dest_path)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            tmp_path = f"{dest_path}.tmp"
+            try:
+                shutil.copy2(src_path, tmp_path)
+                os.replace(tmp_path, dest_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            os.remove(src_path)
+
+        with self.lock:
+            self.persistent_usage['bytes'] += os.path.getsize(dest_path) - replaced_bytes
+            self.persistent_usage['files'] += 1 - replaced_files
+
+        return dest_path
+
+    def discard_scratch(self, task_id):
+        """작업의 임시 디렉토리 삭제"""
+        path = self.scratch_dir(task_id, create=False)
+        if os.path.exists(path):
+            shutil.rmtree(path, ignore_errors=True)
+            _prune_empty_dirs(os.path.dirname(path), self.scratch_root)
+
+    def delete_task_files(self, task_id):
+        """작업의 임시/영구 파일 모두 삭제"""
+        self.discard_scratch(task_id)
+        self._remove_task_dir(self.task_dir(task_id, create=False))
+
+    def _remove_task_dir(self, path):
+        """영구 작업 디렉토리 삭제 및 사용량 반영"""
+        if not os.path.exists(path):
+            return False
+
+        removed_bytes, removed_files = _dir_usage(path)
+        shutil.rmtree(path)
+        _prune_empty_dirs(os.path.dirname(path), self.tasks_dir)
+
+        with self.lock:
+            self.persistent_usage['bytes'] = max(0, self.persistent_usage['bytes'] - removed_bytes)
+            self.persistent_usage['files'] = max(0, self.persistent_usage['files'] - removed_files)
+        return True
+
+    def resolve_output(self, task_id, output_file):
+        """작업 출력 파일의 실제 경로 확인 (없으면 None)"""
+        if not output_file:
+            return None
+
+        if os.path.exists(output_file):
+            return output_file
+
+        # 저장소 위치가 바뀐 경우 현재 샤드 경로에서 다시 찾기
+        candidate = os.path.join(self.task_dir(task_id, create=False), os.path.basename(output_file))
+        if os.path.exists(candidate):
+            return candidate
+
+        return None
+
+    def _iter_task_dirs(self, root):
+        """샤드 하위의 작업 디렉토리 순회 (샤드 이름 형식이 아닌 디렉토리는 무시)"""
+        for first in os.scandir(root):
+            if not first.is_dir() or not _SHARD_NAME.match(first.name):
+                continue
+            for second in os.scandir(first.path):
+                if not second.is_dir() or not _SHARD_NAME.match(second.name):
+                    continue
+                for task in os.scandir(second.path):
+                    if task.is_dir():
+                        yield task.path
+
+    def cleanup(self, max_age, known_ids=(), active_ids=()):
+        """
+        max_age초 이상 지난 작업 디렉토리 삭제, 삭제된 수 반환
+        - known_ids: TaskManager가 관리 중인 작업 (영구 디렉토리는 delete_task로만 삭제)
+        - active_ids: 진행 중인 작업 (.part에 추가 기록만 하면 디렉토리 mtime이 갱신되지 않으므로 보호)
+        """
+        current_time = time.time()
+        cleanup_count = 0
+
+        for root, keep_ids in ((self.tasks_dir, known_ids), (self.scratch_root, active_ids)):
+            for task_dir in list(self._iter_task_dirs(root)):
+                if os.path.basename(task_dir) in keep_ids:
+                    continue
+                try:
+                    if current_time - os.path.getmtime(task_dir) <= max_age:
+                        continue
+                    if root == self.tasks_dir:
+                        self._remove_task_dir(task_dir)
+                    else:
+                        shutil.rmtree(task_dir)
+                        _prune_empty_dirs(os.path.dirname(task_dir), root)
+                    cleanup_count += 1
+                    logger.info("Cleaned up old directory: %s", task_dir)
+                except Exception as e:
+                    logger.error("Failed to cleanup %s: %s", task_dir, e)
+
+        # 이전 평면 구조에 남은 작업 디렉토리 (상태 파일이 없어 이동되지 않은 것)
+        for entry in list(os.scandir(self.base_dir)):
+            if not entry.is_dir() or not _is_task_id(entry.name) or entry.name in known_ids:
+                continue
+            try:
+                if current_time - os.path.getmtime(entry.path) <= max_age:
+                    continue
+                shutil.rmtree(entry.path)
+                cleanup_count += 1
+                logger.info("Cleaned up old directory: %s", entry.path)
+            except Exception as e:
+                logger.error("Failed to cleanup %s: %s", entry.path, e)
+
+        return cleanup_count
+
+    def usage(self):
+        """계층별 사용량 (scratch는 진행 중 파일이라 조회 시 집계)"""
+        scratch_bytes, scratch_files = _dir_usage(self.scratch_root)
+        with self.lock:
+            persistent = dict(self.persistent_usage)
+        return {
+            'persistent': {'path': self.tasks_dir, **persistent},
+            'scratch': {'path': self.scratch_root, 'bytes': scratch_bytes, 'files': scratch_files},
+        }
@@ -8,44 +8,41 @@ from typing import Dict, Any
 
 logger = logging.getLogger(__name__)
 
+# 더 이상 진행되지 않는 작업 상태
+TERMINAL_STATUSES = ('completed', 'failed')
+
 class TaskManager:
     """비동기 작업 관리자"""
     
-    def __init__(self, download_dir):
+    def __init__(self, storage):
         self.tasks = {}  # 작업 상태 저장
-        self.download_dir = download_dir
+        self.storage = storage
         self.lock = threading.Lock()
         
-        # 작업 상태 저장 디렉토리
-        self.status_dir = os.path.join(download_dir, 'status')
-        os.makedirs(self.status_dir, exist_ok=True)
-        
         # 기존 작업 상태 복원
         self._restore_tasks()
         
     def _restore_tasks(self):
         """상태 파일에서 작업 상태 복원"""
         try:
-            for filename in os.listdir(self.status_dir):
-                if filename.endswith('.json'):
-                    task_id = filename[:-5]  # .json 제거
-                    file_path = os.path.join(self.status_dir, filename)
-                    
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            task_data = json.load(f)
+            for task_id, file_path in self.storage.iter_status_files():
+                try:
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        task_data = json.load(f)
+                        
+                    # 파일이 존재하는지 확인
+                    if task_data.get('status') == 'completed':
+                        output_file = self.storage.resolve_output(task_id, task_data.get('output_file'))
+                        if output_file:
+                            task_data['output_file'] = output_file
+                        else:
+                            task_data['status'] = 'failed'
+                            task_data['error'] = 'Output file is missing'
                             
-                        # 파일이 존재하는지 확인
-                        if task_data.get('status') == 'completed':
-                            output_file = task_data.get('output_file')
-                            if output_file and not os.path.exists(output_file):
-                                task_data['status'] = 'failed'
-                                task_data['error'] = 'Output file is missing'
-                                
-                        self.tasks[task_id] = task_data
-                        logger.debug(f"Restored task {task_id}: {task_data['status']}")
-                    except Exception as e:
-                        logger.error(f"Failed to restore task {task_id}: {str(e)}")
+                    self.tasks[task_id] = task_data
+                    logger.debug(f"Restored task {task_id}: {task_data['status']}")
+                except Exception as e:
+                    logger.error(f"Failed to restore task {task_id}: {str(e)}")
         except Exception as e:
             logger.error(f"Failed to restore tasks: {str(e)}")
     
@@ -82,16 +79,17 @@ class TaskManager:
                 return None
             return task.copy()  # 복사본 반환
     
-    def update_task(self, task_id: str, **updates) -> None:
-        """작업 상태 업데이트"""
+    def update_task(self, task_id: str, **updates) -> bool:
+        """작업 상태 업데이트 (작업이 없으면 False)"""
         with self.lock:
             if task_id not in self.tasks:
-                return
+                return False
             
             task = self.tasks[task_id]
             task.update(updates)
             task['updated_at'] = time.time()
             self._save_task_status(task_id)
+            return True
     
     def delete_task(self, task_id: str) -> bool:
         """작업 및 관련 파일 삭제"""
@@ -99,48 +97,71 @@ class TaskManager:
             if task_id not in self.tasks:
                 return False
             
-            task = self.tasks[task_id]
-            output_file = task.get('output_file')
-            
+            output_file = self.tasks[task_id].get('output_file')
+
             # 상태 파일 삭제
-            status_file = os.path.join(self.status_dir, f"{task_id}.json")
-            if os.path.exists(status_file):
-                try:
-                    os.remove(status_file)
-                except Exception as e:
-                    logger.error(f"Failed to delete status file for task {task_id}: {str(e)}")
+            try:
+                self.storage.remove_status(task_id)
+            except Exception as e:
+                logger.error(f"Failed to delete status file for task {task_id}: {str(e)}")
             
-            # 출력 파일 삭제 (있는 경우)
+            # 출력 파일 및 정보 파일 삭제 (작업 디렉토리 단위)
+            try:
+                self.storage.delete_task_files(task_id)
+            except Exception as e:
+                logger.error(f"Failed to delete files for task {task_id}: {str(e)}")
+
+            # 이전 평면 구조에 남아있는 출력 파일 삭제
             if output_file and os.path.exists(output_file):
                 try:
                     os.remove(output_file)
                 except Exception as e:
                     logger.error(f"Failed to delete output file for task {task_id}: {str(e)}")
-            
-            # 연관된 정보 파일 삭제
-            if output_file:
-                video_id = os.path.splitext(os.path.basename(output_file))[0]
-                info_file = os.path.join(self.download_dir, f"{video_id}.info.txt")
-                if os.path.exists(info_file):
-                    try:
-                        os.remove(info_file)
-                    except Exception as e:
-                        logger.error(f"Failed to delete info file for task {task_id}: {str(e)}")
-            
+
             # 작업 삭제
             del self.tasks[task_id]
             
             return True
     
+    def cleanup(self, max_age: float) -> int:
+        """
+        max_age초 이상 갱신되지 않은 완료/실패 작업과 남은 파일 정리
+        작업 항목과 상태 파일, 출력 파일을 함께 삭제하고 삭제된 수 반환
+        """
+        current_time = time.time()
+        
+        with self.lock:
+            expired = [
+                task_id for task_id, task in self.tasks.items()
+                if task.get('status') in TERMINAL_STATUSES
+                and current_time - task.get('updated_at', 0) > max_age
+            ]
+        
+        cleanup_count = 0
+        for task_id in expired:
+            if self.delete_task(task_id):
+                cleanup_count += 1
+                logger.info(f"Cleaned up expired task {task_id}")
+        
+        # 작업 항목이 없는 고아 디렉토리 및 종료된 작업의 임시 디렉토리 정리
+        with self.lock:
+            known_ids = set(self.tasks)
+            active_ids = {
+                task_id for task_id, task in self.tasks.items()
+                if task.get('status') not in TERMINAL_STATUSES
+            }
+        cleanup_count += self.storage.cleanup(max_age, known_ids, active_ids)
+        
+        return cleanup_count
+    
     def _save_task_status(self, task_id: str) -> None:
         """작업 상태를 파일로 저장"""
         task = self.tasks.get(task_id)
         if not task:
             return
             
-        status_file = os.path.join(self.status_dir, f"{task_id}.json")
-        
         try:
+            status_file = self.storage.status_path(task_id, create=True)
             with open(status_file, 'w', encoding='utf-8') as f:
                 json.dump(task, f, ensure_ascii=False)
         except Exception as e: